@@ -16,38 +16,152 @@ generated by the **new** kmer models.
 
 Dependencies:
 * numpy >= 1.11.2
-* scipy >= 0.18.1
-* sklearn >= 0.18.1
+* pandas >= 0.24.0
+* pyarrow >= 1.0.0 (optional; speeds up reading the TSV files)
+* numba >= 0.49 (optional; speeds up labelling the samples by region)
+* numexpr >= 2.6 (optional; speeds up evaluating log-likelihoods)
 """
 import csv
 import numpy as np
+import pandas as pd
 import argparse
 import os
-from scipy.stats import norm
-from sklearn.mixture import GaussianMixture
+import multiprocessing
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+except ImportError:
+    pa = None
+try:
+    import numba
+except ImportError:
+    numba = None
+try:
+    import numexpr
+except ImportError:
+    numexpr = None
 
 
 log_inv_sqrt_2pi = np.log(0.3989422804014327)
+# integer labels of the regions (see `region_search`); any other region is labelled UNKNOWN:
+REGION_LABELS = { 'START': 0, 'LEADER': 1, 'ADAPTER': 2, 'POLYA': 3, 'TRANSCRIPT': 5 }
+UNKNOWN_LABEL = 6
+# columns of the `polya-samples` rows output by `nanopolish polya -vv`:
+SAMPLES_TSV_HEADERS = ['tag','read_id', 'chr', 'idx', 'sample', 'scaled_sample',
+                       's_llh', 'l_llh','a_llh','p_llh', 'c_llh', 't_llh','region']
+# number of rows parsed at a time when streaming over a `polya-samples` TSV with pandas:
+CHUNK_SIZE = 1000000
+
+
 def log_normal_pdf(xs, mu, sigma):
     """Compute the log-normal PDF of a given sample(s) against a mu and sigma."""
-    alpha = (xs - mu) * np.reciprocal(sigma)
-    return ( log_inv_sqrt_2pi - np.log(sigma) + (-0.5 * alpha * alpha) )
+    # precompute the terms that don't depend on `xs`:
+    const = log_inv_sqrt_2pi - np.log(sigma)
+    inv_sigma = np.reciprocal(np.asarray(sigma, dtype=float))
+    if numexpr is not None:
+        # evaluate the whole expression in a single fused pass over `xs`:
+        return numexpr.evaluate("const - 0.5 * ((xs - mu) * inv_sigma)**2",
+                                local_dict={ 'xs': xs, 'mu': mu, 'inv_sigma': inv_sigma, 'const': const })
+    # otherwise, reuse a single temporary array for the intermediate results (allocated with
+    # the same floating point type as numexpr would use, so that both paths agree):
+    alpha = np.subtract(xs, mu, dtype=np.result_type(xs, mu, inv_sigma, np.float32))
+    alpha *= inv_sigma
+    alpha *= alpha
+    alpha *= -0.5
+    alpha += const
+    return alpha
 
 
 def fit_gaussian(samples):
     """Given a numpy array of floating point samples, fit a gaussian distribution."""
-    mu, sigma = norm.fit(samples)
-    return (mu,sigma)
+    # the maximum-likelihood estimates of a gaussian have a closed form:
+    # (accumulate in double precision, as the samples may be stored in single precision)
+    mu = samples.mean(dtype=np.float64)
+    sigma = samples.std(dtype=np.float64)
+    return (float(mu), float(sigma))
+
+
+def fit_gmm2(samples, niters=100, tol=1e-6, reg_covar=1e-6):
+    """
+    Given a numpy array of floating point samples, fit a two-component gaussian mixture model
+    by expectation-maximization, returning its params as a list of (coeff, mu, var) tuples.
+
+    The EM loop runs until the average log-likelihood improves by less than `tol` (or for at
+    most `niters` iterations); `reg_covar` is added to the variances to keep them positive.
+    """
+    xs = samples.astype(np.float64).reshape(-1,1)
+    # initialize the components at the lower and upper quartiles of the samples, or at their
+    # extremes if the quartiles coincide (otherwise both components would stay identical):
+    pi = np.array([0.5, 0.5])
+    mu = np.percentile(xs, [25, 75])
+    if mu[0] == mu[1]:
+        mu = np.array([xs.min(), xs.max()])
+    var = np.full(2, xs.var() + reg_covar)
+    prev_llh = -np.inf
+    for _ in range(niters):
+        # E-step: compute the responsibilities of each component for each sample:
+        log_probs = log_normal_pdf(xs, mu, np.sqrt(var)) + np.log(pi)
+        log_totals = np.logaddexp(log_probs[:,0], log_probs[:,1])
+        resp = np.exp(log_probs - log_totals[:,None])
+        # M-step: re-estimate the weights, means and variances:
+        # (keep `nk` positive so that a collapsed component doesn't give NaN parameters)
+        nk = resp.sum(axis=0) + 10 * np.finfo(resp.dtype).eps
+        mu = (resp * xs).sum(axis=0) / nk
+        var = (resp * (xs - mu)**2).sum(axis=0) / nk + reg_covar
+        pi = nk / xs.shape[0]
+        # stop once the log-likelihood has converged:
+        llh = log_totals.mean()
+        if llh - prev_llh < tol:
+            break
+        prev_llh = llh
+    # return params of GMM in [(coeff, mu, var)] format:
+    return list(zip(pi.tolist(), mu.tolist(), var.tolist()))
+
+
+def iter_samples_tsv(tsv_path, dtypes, chunksize=CHUNK_SIZE):
+    """
+    Read a subset of the columns of a `polya-samples` TSV as a stream of pandas DataFrames, where
+    `dtypes` is a dict mapping each wanted column to one of 'float32', 'float64', 'int64', 'str'
+    or 'category'.
 
+    If pyarrow is available, the file is parsed with its streaming, block-wise CSV reader;
+    otherwise, we fall back to the C parser of pandas, reading `chunksize` rows at a time.
+    """
+    if pa is None:
+        for chunk in pd.read_csv(tsv_path, sep='\t', header=None, names=SAMPLES_TSV_HEADERS,
+                                 usecols=list(dtypes), dtype=dtypes, quoting=csv.QUOTE_NONE,
+                                 engine='c', chunksize=chunksize):
+            yield chunk
+        return
+    arrow_types = { 'float32': pa.float32(), 'float64': pa.float64(), 'int64': pa.int64(), 'str': pa.string(),
+                    'category': pa.dictionary(pa.int32(), pa.string()) }
+    reader = pacsv.open_csv(tsv_path,
+                            read_options=pacsv.ReadOptions(column_names=SAMPLES_TSV_HEADERS,
+                                                           use_threads=True, block_size=64<<20),
+                            parse_options=pacsv.ParseOptions(delimiter='\t', quote_char=False),
+                            convert_options=pacsv.ConvertOptions(
+                                include_columns=list(dtypes),
+                                column_types={ col: arrow_types[dt] for col, dt in dtypes.items() }))
+    for batch in reader:
+        yield batch.to_pandas()
+
+
+def partition_by_label(values, labels, keep):
+    """
+    Given an array of values and an equal-length array of non-negative integer labels,
+    return a list of arrays where the i-th array holds (in their original order) the values
+    labelled `keep[i]`.
 
-def fit_gmm(samples, ncomponents=2):
-    """Given a numpy array of floating point samples, fit a gaussian mixture model."""
-    # assume samples is of shape (NSAMPLES,); unsqueeze to (NSAMPLES,1) and train a GMM:
-    gmm = GaussianMixture(n_components=ncomponents)
-    gmm.fit(samples.reshape(-1,1))
-    # return params of GMM in [(coeff, mu, sigma)] format:
-    params = [(gmm.weights_[c], gmm.means_[c][0], gmm.covariances_[c][0][0]) for c in range(ncomponents)]
-    return params
+    This is done in a single pass with a stable sort, rather than one mask per label. Each
+    returned array is a fresh copy, so values with other labels are not kept in memory.
+    """
+    order = np.argsort(labels, kind='stable')
+    counts = np.bincount(labels, minlength=max(keep)+1)
+    ends = np.cumsum(counts)
+    starts = ends - counts
+    return [ values[order[starts[label]:ends[label]]] for label in keep ]
 
 
 def old_tsv_to_numpy(tsv_path):
@@ -60,45 +174,36 @@ def old_tsv_to_numpy(tsv_path):
     * P_loglkhd: the log-likelihoods of the samples belonging to the POLYA segment.
     * T_loglkhd: the log-likelihoods of the samples belonging to the TRANSCRIPT segment.
     """
-    # instantiate arrays to hold values:
-    S_loglkhd = []
-    L_loglkhd = []
-    A_loglkhd = []
-    P_loglkhd = []
-    T_loglkhd = []
-
-    # loop over TSV file and append data to arrays:
-    str2int = { 'START': 0, 'LEADER': 1, 'ADAPTER': 2, 'POLYA': 3, 'TRANSCRIPT': 5 }
-    with open(tsv_path, 'r') as f:
-        headers =  ['tag','read_id', 'chr', 'idx', 'sample', 'scaled_sample',
-                    's_llh', 'l_llh','a_llh','p_llh', 'c_llh', 't_llh','region']
-        rdr = csv.DictReader(f, delimiter='\t', quoting=csv.QUOTE_NONE, fieldnames=headers)
-        for row in rdr:
-            # parse row fields:
-            s_llh = float(row['s_llh'])
-            l_llh = float(row['l_llh'])
-            a_llh = float(row['a_llh'])
-            p_llh = float(row['p_llh'])
-            t_llh = float(row['t_llh'])
-            region = row['region']
-            
-            # append log-likelihoods to appropriate arrays:
-            if region == 'START':
-                S_loglkhd.append(s_llh)
-            if region == 'LEADER':
-                L_loglkhd.append(l_llh)
-            if region == 'ADAPTER':
-                A_loglkhd.append(a_llh)
-            if region == 'POLYA':
-                P_loglkhd.append(p_llh)
-            if region == 'TRANSCRIPT':
-                T_loglkhd.append(t_llh)
-    
-    return { "S_loglkhd": np.array(S_loglkhd, dtype=float),
-             "L_loglkhd": np.array(L_loglkhd, dtype=float),
-             "A_loglkhd": np.array(A_loglkhd, dtype=float),
-             "P_loglkhd": np.array(P_loglkhd, dtype=float),
-             "T_loglkhd": np.array(T_loglkhd, dtype=float) }
+    # the log-likelihood columns, and the column holding the log-likelihoods of each label
+    # (samples of unlabelled regions are discarded, so their column doesn't matter):
+    columns = ['s_llh', 'l_llh', 'a_llh', 'p_llh', 't_llh']
+    label_columns = np.array([0, 1, 2, 3, 0, 4, 0])
+
+    # stream over the needed columns of the TSV file, parsed directly into typed arrays,
+    # and collect the region label and log-likelihood of every sample in a single pass:
+    dtypes = { 's_llh': 'float64', 'l_llh': 'float64', 'a_llh': 'float64',
+               'p_llh': 'float64', 't_llh': 'float64', 'region': 'category' }
+    labels = []
+    loglkhds = []
+    for df in iter_samples_tsv(tsv_path, dtypes):
+        # convert the region names to integer labels:
+        region = df['region'].cat
+        lookup = np.array([REGION_LABELS.get(name, UNKNOWN_LABEL) for name in region.categories] + [UNKNOWN_LABEL],
+                          dtype=np.int8)
+        chunk_labels = lookup[region.codes.to_numpy()]
+        # keep the log-likelihood of each sample under the model of its own region:
+        chunk_loglkhds = df[columns].to_numpy(dtype=float)
+        loglkhds.append(chunk_loglkhds[np.arange(len(df)), label_columns[chunk_labels]])
+        labels.append(chunk_labels)
+
+    # split the log-likelihoods into contiguous per-segment arrays:
+    S_loglkhd, L_loglkhd, A_loglkhd, P_loglkhd, T_loglkhd = partition_by_label(
+        np.concatenate(loglkhds), np.concatenate(labels), [0, 1, 2, 3, 5])
+    return { "S_loglkhd": S_loglkhd,
+             "L_loglkhd": L_loglkhd,
+             "A_loglkhd": A_loglkhd,
+             "P_loglkhd": P_loglkhd,
+             "T_loglkhd": T_loglkhd }
 
 
 def make_segmentation_dict(segmentations_tsv_path):
@@ -111,25 +216,44 @@ def make_segmentation_dict(segmentations_tsv_path):
     Note that this function only takes the first available segmentation for each read, i.e.
     if a read id appears more than once in the TSV, only the first segmentation is kept, and
     later occurrences of the read id in the TSV are ignored.
+
+    Returns a tuple `(segments, sorted_read_ids)` of a dictionary holding the segmentation
+    intervals of each read, keyed by read ID, and the sorted list of its keys (see `find_segment`).
+    """
+    # parse the needed columns of the TSV file and keep the first segmentation of each read:
+    headers = ['tag', 'read_id', 'pos', 'L_start', 'A_start', 'P_start', 'P_end', 'rate', 'plen', 'alen']
+    columns = ['L_start', 'A_start', 'P_start', 'P_end']
+    df = pd.read_csv(segmentations_tsv_path, sep='\t', header=None, names=headers,
+                     usecols=['read_id'] + columns,
+                     dtype={ 'read_id': str, 'L_start': 'float64', 'A_start': 'float64',
+                             'P_start': 'float64', 'P_end': 'float64' },
+                     quoting=csv.QUOTE_NONE, engine='c')
+    df = df.drop_duplicates('read_id', keep='first')
+    # the sample indices are written as floats; truncate them to ints in one go:
+    df[columns] = df[columns].astype('int64')
+    segments = df.set_index('read_id').to_dict('index')
+    return (segments, sorted(segments))
+
+
+def find_segment(read_id, segments, sorted_read_ids):
     """
-    segments = {}
-    # loop thru TSV and update the list of segmentations:
-    with open(segmentations_tsv_path, 'r') as f:
-        headers = ['tag', 'read_id', 'pos', 'L_start', 'A_start', 'P_start', 'P_end', 'rate', 'plen', 'alen']
-        rdr = csv.DictReader(f, delimiter='\t', quoting=csv.QUOTE_NONE, fieldnames=headers)
-        for row in rdr:
-            if row['read_id'] not in list(segments.keys()):
-                segments[row['read_id']] = { 'L_start': int(float(row['L_start'])),
-                                             'A_start': int(float(row['A_start'])),
-                                             'P_start': int(float(row['P_start'])),
-                                             'P_end': int(float(row['P_end'])) }
-    return segments
-
-
-def region_search(read_id, sample_ix, segmentations):
+    Look up the segmentation of the read whose ID starts with `read_id` (`polya-samples` rows
+    only hold a truncated read ID), returning None if there is no such read.
+
+    As `sorted_read_ids` is sorted, any read ID starting with `read_id` sorts right after it,
+    so a binary search finds the match in O(log R). If several read IDs start with `read_id`,
+    the lexicographically first one is used.
+    """
+    i = bisect_left(sorted_read_ids, read_id)
+    if i < len(sorted_read_ids) and sorted_read_ids[i].startswith(read_id):
+        return segments[sorted_read_ids[i]]
+    return None
+
+
+def region_search(read_id, sample_ix, segments, sorted_read_ids):
     """
-    Given a dictionary of ("gold-standard") segmentations, look up the region that a
-    given read and sample index belongs to.
+    Given a dictionary of ("gold-standard") segmentations and its sorted keys (see
+    `make_segmentation_dict`), look up the region that a given read and sample index belongs to.
 
     Returns an integer label out of 0,1,2,3,4,5 where:
     0 => START, 1 => LEADER, 2 => ADAPTER, 3 => POLYA, 5 => TRANSCRIPT, 6 => UNKNOWN
@@ -138,20 +262,17 @@ def region_search(read_id, sample_ix, segmentations):
     a uniform distribution.)
     """
     # find read ID in segmentations:
-    read_key = None
-    for long_read_id in list(segmentations.keys()):
-        if long_read_id[0:len(read_id)] == read_id:
-            read_key = long_read_id
+    segment = find_segment(read_id, segments, sorted_read_ids)
 
     # return UNK if read not found:
-    if read_key == None:
-        return 6
+    if segment is None:
+        return UNKNOWN_LABEL
 
     # find region that `sample_ix` belongs to:
-    l_start = segmentations[read_key]['L_start']
-    a_start = segmentations[read_key]['A_start']
-    p_start = segmentations[read_key]['P_start']
-    p_end = segmentations[read_key]['P_end']
+    l_start = segment['L_start']
+    a_start = segment['A_start']
+    p_start = segment['P_start']
+    p_end = segment['P_end']
     if (sample_ix < l_start):
         return 0
     if (sample_ix < a_start):
@@ -162,54 +283,110 @@ def region_search(read_id, sample_ix, segmentations):
         return 3
     if (sample_ix > p_end):
         return 5
-    return 6
+    return UNKNOWN_LABEL
+
 
+def classify_samples(sample_ixs, codes, found, l_starts, a_starts, p_starts, p_ends):
+    """
+    Given an array of sample indices and an array of codes indexing into the per-read arrays
+    `found, l_starts, a_starts, p_starts, p_ends` (where a code of -1 refers to their last
+    entry), return an array of region labels using the labelling scheme of `region_search`.
+    """
+    return np.select([ ~found[codes],
+                       sample_ixs < l_starts[codes],
+                       sample_ixs < a_starts[codes],
+                       sample_ixs < p_starts[codes],
+                       sample_ixs <= p_ends[codes] ],
+                     [UNKNOWN_LABEL, 0, 1, 2, 3], default=5)
+
+
+if numba is not None:
+    # if numba is available, replace the above with a compiled, multi-threaded loop:
+    @numba.njit(parallel=True, cache=True)
+    def classify_samples(sample_ixs, codes, found, l_starts, a_starts, p_starts, p_ends):
+        labels = np.empty(sample_ixs.size, dtype=np.int8)
+        for i in numba.prange(sample_ixs.size):
+            c = codes[i]
+            if c < 0:
+                c = found.size - 1
+            ix = sample_ixs[i]
+            if not found[c]:
+                labels[i] = UNKNOWN_LABEL
+            elif ix < l_starts[c]:
+                labels[i] = 0
+            elif ix < a_starts[c]:
+                labels[i] = 1
+            elif ix < p_starts[c]:
+                labels[i] = 2
+            elif ix <= p_ends[c]:
+                labels[i] = 3
+            else:
+                labels[i] = 5
+        return labels
+
+
+def label_regions(read_ids, sample_ixs, segments, sorted_read_ids):
+    """
+    Vectorized version of `region_search`: given arrays of (truncated) read IDs and sample
+    indices, return an integer array of region labels using the same labelling scheme.
 
-def new_tsv_to_numpy(tsv_path, segmentations):
+    The segmentation intervals of each distinct read are looked up once, then every sample
+    is classified by comparing its index against the intervals of its read.
+    """
+    # map each read ID to an integer code and fetch the intervals of each distinct read;
+    # the extra trailing row holds the intervals of reads with no segmentation:
+    codes, uniques = pd.factorize(np.asarray(read_ids))
+    found = np.zeros(len(uniques) + 1, dtype=bool)
+    l_starts = np.zeros(len(uniques) + 1, dtype=np.int64)
+    a_starts = np.zeros(len(uniques) + 1, dtype=np.int64)
+    p_starts = np.zeros(len(uniques) + 1, dtype=np.int64)
+    p_ends = np.zeros(len(uniques) + 1, dtype=np.int64)
+    for c, read_id in enumerate(uniques):
+        seg = find_segment(read_id, segments, sorted_read_ids)
+        if seg is None:
+            continue
+        found[c] = True
+        l_starts[c] = seg['L_start']
+        a_starts[c] = seg['A_start']
+        p_starts[c] = seg['P_start']
+        p_ends[c] = seg['P_end']
+
+    # classify all samples at once:
+    return classify_samples(np.asarray(sample_ixs), codes, found, l_starts, a_starts, p_starts, p_ends)
+
+
+def new_tsv_to_numpy(tsv_path, segments, sorted_read_ids):
     """
     Read a TSV of new, miscalled samples and a dictionary of correct segmentations (coming from
     an older, correct TSV) and return a dict of numpy arrays.
 
     Args:
     * tsv_path: path to a TSV generated by `nanopolish polya -vv [...]`.
-    * segmentations: a dictionary of segmentation intervals, given in numpy format.
+    * segments: a dictionary of segmentation intervals, keyed by read ID.
+    * sorted_read_ids: the sorted keys of `segments`.
 
-    Returns: a dictionary of numpy arrays.
+    Returns: a dictionary of (single-precision) numpy arrays.
     """
-    # instantiate arrays to hold values:
-    S_samples = []
-    L_samples = []
-    A_samples = []
-    P_samples = []
-    T_samples = []
-
-    # loop over TSV file and append data to arrays:
-    with open(tsv_path, 'r') as f:
-        headers =  ['tag','read_id', 'chr', 'idx', 'sample', 'scaled_sample',
-                    's_llh', 'l_llh','a_llh','p_llh', 'c_llh', 't_llh','region']
-        rdr = csv.DictReader(f, delimiter='\t', quoting=csv.QUOTE_NONE, fieldnames=headers)
-        for row in rdr:
-            scaled_sample = float(row['scaled_sample'])
-            read = row['read_id']
-            contig = row['chr']
-            index = int(row['idx'])
-            region = region_search(read, index, segmentations)
-            if region == 0:
-                S_samples.append(scaled_sample)
-            if region == 1:
-                L_samples.append(scaled_sample)
-            if region == 2:
-                A_samples.append(scaled_sample)
-            if region == 3:
-                P_samples.append(scaled_sample)
-            if region == 5:
-                T_samples.append(scaled_sample)
-            
-    return { "S_samples": np.array(S_samples, dtype=float),
-             "L_samples": np.array(L_samples, dtype=float),
-             "A_samples": np.array(A_samples, dtype=float),
-             "P_samples": np.array(P_samples, dtype=float),
-             "T_samples": np.array(T_samples, dtype=float) }
+    # stream over the needed columns of the TSV file, parsed directly into typed arrays,
+    # and collect the region label and value of every sample in a single pass:
+    # (the scaled samples are stored in single precision, which is more than enough for
+    # the digitized current and halves the memory traffic of the fits and benchmarks)
+    dtypes = { 'read_id': 'str', 'idx': 'int64', 'scaled_sample': 'float32' }
+    labels = []
+    samples = []
+    for df in iter_samples_tsv(tsv_path, dtypes):
+        labels.append(label_regions(df['read_id'].to_numpy(), df['idx'].to_numpy(),
+                                    segments, sorted_read_ids))
+        samples.append(df['scaled_sample'].to_numpy(dtype=np.float32))
+
+    # split the samples into contiguous per-segment arrays:
+    S_samples, L_samples, A_samples, P_samples, T_samples = partition_by_label(
+        np.concatenate(samples), np.concatenate(labels), [0, 1, 2, 3, 5])
+    return { "S_samples": S_samples,
+             "L_samples": L_samples,
+             "A_samples": A_samples,
+             "P_samples": P_samples,
+             "T_samples": T_samples }
 
 
 def main(old_samples_tsv, old_segmentations_tsv, new_samples_tsv, benchmark=True):
@@ -226,17 +403,23 @@ def main(old_samples_tsv, old_segmentations_tsv, new_samples_tsv, benchmark=True
     ### read all samples into numpy arrays:
     print("Loading data from TSV...")
     old_data = old_tsv_to_numpy(old_samples_tsv)
-    segmentations = make_segmentation_dict(old_segmentations_tsv)
-    new_data = new_tsv_to_numpy(new_samples_tsv, segmentations)
+    segments, sorted_read_ids = make_segmentation_dict(old_segmentations_tsv)
+    new_data = new_tsv_to_numpy(new_samples_tsv, segments, sorted_read_ids)
     print("... Datasets loaded.")
 
     ### infer best possible new mu,sigma for each of S, L, A, P, T:
     print("Fitting gaussians to new scaled samples (this may take a while)...")
-    new_mu_S, new_sigma_S = fit_gaussian(new_data['S_samples'])
-    new_mu_L, new_sigma_L = fit_gaussian(new_data['L_samples'])
-    (new_pi0_A, new_mu0_A, new_sig0_A), (new_pi1_A, new_mu1_A, new_sig1_A) = fit_gmm(new_data['A_samples'], ncomponents=2)
-    new_mu_P, new_sigma_P = fit_gaussian(new_data['P_samples'])
-    (new_pi0_T, new_mu0_T, new_sig0_T), (new_pi1_T, new_mu1_T, new_sig1_T) = fit_gmm(new_data['T_samples'], ncomponents=2)
+    # (the fits are independent, so the expensive GMM fits run in separate worker processes
+    # while the closed-form gaussian fits are computed here; workers are spawned rather than
+    # forked, as forking after pyarrow/numba have started their thread pools can deadlock)
+    with ProcessPoolExecutor(max_workers=2, mp_context=multiprocessing.get_context('spawn')) as executor:
+        gmm_A = executor.submit(fit_gmm2, new_data['A_samples'])
+        gmm_T = executor.submit(fit_gmm2, new_data['T_samples'])
+        new_mu_S, new_sigma_S = fit_gaussian(new_data['S_samples'])
+        new_mu_L, new_sigma_L = fit_gaussian(new_data['L_samples'])
+        new_mu_P, new_sigma_P = fit_gaussian(new_data['P_samples'])
+        (new_pi0_A, new_mu0_A, new_sig0_A), (new_pi1_A, new_mu1_A, new_sig1_A) = gmm_A.result()
+        (new_pi0_T, new_mu0_T, new_sig0_T), (new_pi1_T, new_mu1_T, new_sig1_T) = gmm_T.result()
 
     ### print to stdout:
     print("New params for START: mu = {0}, var = {1}, stdv = {2}".format(new_mu_S, new_sigma_S, np.sqrt(new_sigma_S)))
@@ -253,31 +436,35 @@ def main(old_samples_tsv, old_segmentations_tsv, new_samples_tsv, benchmark=True
 
     print("===== Emission Log-Likelihood Benchmarks =====")
     old_S_llh = np.mean(old_data['S_loglkhd'])
-    new_S_llh = np.mean(norm.logpdf(new_data['S_samples'], loc=new_mu_S, scale=np.sqrt(new_sigma_S)))
+    new_S_llh = np.mean(log_normal_pdf(new_data['S_samples'], new_mu_S, np.sqrt(new_sigma_S)), dtype=np.float64)
     print("> Average START log-probs:")
     print("> Old avg. log-likelihood: {0} | New avg. log-likelihood: {1}".format(old_S_llh, new_S_llh))
     
     old_L_llh = np.mean(old_data['L_loglkhd'])
-    new_L_llh = np.mean(norm.logpdf(new_data['L_samples'], loc=new_mu_L, scale=np.sqrt(new_sigma_L)))
+    new_L_llh = np.mean(log_normal_pdf(new_data['L_samples'], new_mu_L, np.sqrt(new_sigma_L)), dtype=np.float64)
     print("> Average LEADER log-probs:")
     print("> Old avg. log-likelihood: {0} | New avg. log-likelihood: {1}".format(old_L_llh, new_L_llh))
 
     old_A_llh = np.mean(old_data['A_loglkhd'])
-    new_A_llh0 = new_pi0_A * norm.pdf(new_data['A_samples'], loc=new_mu0_A, scale=np.sqrt(new_sig0_A))
-    new_A_llh1 = new_pi1_A * norm.pdf(new_data['A_samples'], loc=new_mu1_A, scale=np.sqrt(new_sig1_A))
-    new_A_llh = np.mean(np.log(new_A_llh0 + new_A_llh1))
+    new_A_llh0 = log_normal_pdf(new_data['A_samples'], new_mu0_A, np.sqrt(new_sig0_A))
+    new_A_llh0 += np.log(new_pi0_A)
+    new_A_llh1 = log_normal_pdf(new_data['A_samples'], new_mu1_A, np.sqrt(new_sig1_A))
+    new_A_llh1 += np.log(new_pi1_A)
+    new_A_llh = np.mean(np.logaddexp(new_A_llh0, new_A_llh1, out=new_A_llh0), dtype=np.float64)
     print("> Average ADAPTER log-probs:")
     print("> Old avg. log-likelihood: {0} | New avg. log-likelihood: {1}".format(old_A_llh, new_A_llh))
 
     old_P_llh = np.mean(old_data['P_loglkhd'])
-    new_P_llh = np.mean(norm.logpdf(new_data['P_samples'], loc=new_mu_P, scale=np.sqrt(new_sigma_P)))
+    new_P_llh = np.mean(log_normal_pdf(new_data['P_samples'], new_mu_P, np.sqrt(new_sigma_P)), dtype=np.float64)
     print("> Average POLYA log-probs:")
     print("> Old avg. log-likelihood: {0} | New avg. log-likelihood: {1}".format(old_P_llh, new_P_llh))
 
     old_T_llh = np.mean(old_data['T_loglkhd'])
-    new_T_llh0 = new_pi0_T * norm.pdf(new_data['T_samples'], loc=new_mu0_T, scale=np.sqrt(new_sig0_T))
-    new_T_llh1 = new_pi1_T * norm.pdf(new_data['T_samples'], loc=new_mu1_T, scale=np.sqrt(new_sig1_T))
-    new_T_llh = np.mean(np.log(new_T_llh0 + new_T_llh1))
+    new_T_llh0 = log_normal_pdf(new_data['T_samples'], new_mu0_T, np.sqrt(new_sig0_T))
+    new_T_llh0 += np.log(new_pi0_T)
+    new_T_llh1 = log_normal_pdf(new_data['T_samples'], new_mu1_T, np.sqrt(new_sig1_T))
+    new_T_llh1 += np.log(new_pi1_T)
+    new_T_llh = np.mean(np.logaddexp(new_T_llh0, new_T_llh1, out=new_T_llh0), dtype=np.float64)
     print("> Average TRANSCRIPT log-probs:")
     print("> Old avg. log-likelihood: {0} | New avg. log-likelihood: {1}".format(old_T_llh, new_T_llh))
 